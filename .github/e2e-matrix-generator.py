@@ -16,20 +16,21 @@
 
 import argparse
 import json
+import os
 import re
 import sys
-from operator import itemgetter
+from functools import lru_cache
+from types import MappingProxyType
 from typing import Dict, List
 
 POSTGRES_REPO = "ghcr.io/cloudnative-pg/postgresql"
 PG_VERSIONS_FILE = ".github/pg_versions.json"
 
 
-class VersionList(list):
+class VersionList(tuple):
     """List of versions"""
 
-    def __init__(self, versions: List[str]):
-        super().__init__(versions)
+    __slots__ = ()
 
     @property
     def latest(self):
@@ -44,19 +45,17 @@ class MajorVersionList(dict):
     """List of major versions, with multiple patch levels"""
 
     def __init__(self, version_lists: Dict[str, List[str]]):
-        sorted_versions = {
-            k: VersionList(version_lists[k]) for k in version_lists.keys()
-        }
-        super().__init__(sorted_versions)
-        self.versions = list(self.keys())
+        super().__init__({k: VersionList(v) for k, v in version_lists.items()})
+        self._first = next(iter(self))
+        self._last = next(reversed(self))
 
     @property
     def latest(self):
-        return self.get(self.versions[0])
+        return self[self._first]
 
     @property
     def oldest(self):
-        return self.get(self.versions[-1])
+        return self[self._last]
 
 
 # Kubernetes versions to use during the tests
@@ -82,73 +81,94 @@ with open(PG_VERSIONS_FILE, "r") as json_file:
     postgres_versions = json.load(json_file)
 POSTGRES = MajorVersionList(postgres_versions)
 
+# Image references for every PostgreSQL version above, built once
+POSTGRES_IMG = {
+    version: f"{POSTGRES_REPO}:{version}"
+    for version_list in POSTGRES.values()
+    for version in version_list
+}
+
 
-class E2EJob(dict):
+class E2EJob:
     """Build a single job of the matrix"""
 
+    __slots__ = (
+        "id",
+        "k8s_version",
+        "postgres_version",
+        "postgres_version_pre",
+    )
+
+    @staticmethod
+    def build_id(k8s_version, postgres_version):
+        return f"{k8s_version}-PostgreSQL-{postgres_version}"
+
     def __init__(self, k8s_version, postgres_version_list):
         postgres_version = postgres_version_list.latest
         postgres_version_pre = postgres_version_list.oldest
 
-        name = f"{k8s_version}-PostgreSQL-{postgres_version}"
-        repo = POSTGRES_REPO
-
-        super().__init__(
-            {
-                "id": name,
-                "k8s_version": k8s_version,
-                "postgres_version": postgres_version,
-                "postgres_img": f"{repo}:{postgres_version}",
-                "postgres_pre_img": f"{repo}:{postgres_version_pre}",
-            }
-        )
+        self.id = E2EJob.build_id(k8s_version, postgres_version)
+        self.k8s_version = k8s_version
+        self.postgres_version = postgres_version
+        self.postgres_version_pre = postgres_version_pre
 
-    def __hash__(self):
-        return hash(self["id"])
+    @property
+    def postgres_img(self):
+        return POSTGRES_IMG[self.postgres_version]
+
+    @property
+    def postgres_pre_img(self):
+        return POSTGRES_IMG[self.postgres_version_pre]
+
+    def to_dict(self):
+        """Return the job in the format expected by the GitHub matrix"""
+        return {
+            "id": self.id,
+            "k8s_version": self.k8s_version,
+            "postgres_version": self.postgres_version,
+            "postgres_img": self.postgres_img,
+            "postgres_pre_img": self.postgres_pre_img,
+        }
 
 
+def add_jobs(jobs, pairs):
+    """Add a job for each (k8s, postgres) pair whose id is not in jobs yet"""
+    for k8s_version, postgres_version_list in pairs:
+        name = E2EJob.build_id(k8s_version, postgres_version_list.latest)
+        if name not in jobs:
+            jobs[name] = E2EJob(k8s_version, postgres_version_list)
+    return jobs
+
+
+@lru_cache(maxsize=1)
 def build_push_include_local():
     """Build the list of tests running on push"""
-    return {
-        E2EJob(K8S.latest, POSTGRES.latest),
-        E2EJob(K8S.oldest, POSTGRES.oldest),
-    }
+    jobs = add_jobs(
+        {},
+        [(K8S.latest, POSTGRES.latest), (K8S.oldest, POSTGRES.oldest)],
+    )
+    return MappingProxyType(jobs)
 
 
+@lru_cache(maxsize=1)
 def build_pull_request_include_local():
     """Build the list of tests running on pull request"""
-    result = build_push_include_local()
+    # Iterate over K8S versions, then over PostgreSQL versions
+    pairs = [(k8s_version, POSTGRES.latest) for k8s_version in K8S]
+    pairs += [(K8S.latest, postgres_version) for postgres_version in POSTGRES.values()]
 
-    # Iterate over K8S versions
-    for k8s_version in K8S:
-        result |= {
-            E2EJob(k8s_version, POSTGRES.latest),
-        }
-
-    # Iterate over PostgreSQL versions
-    for postgres_version in POSTGRES.values():
-        result |= {E2EJob(K8S.latest, postgres_version)}
-
-    return result
+    jobs = add_jobs(dict(build_push_include_local()), pairs)
+    return MappingProxyType(jobs)
 
 
+@lru_cache(maxsize=1)
 def build_main_include_local():
     """Build the list tests running on main"""
-    result = build_pull_request_include_local()
-
-    # Iterate over K8S versions
-    for k8s_version in K8S:
-        result |= {
-            E2EJob(k8s_version, POSTGRES.latest),
-        }
-
-    # Iterate over PostgreSQL versions
-    for postgres_version in POSTGRES.values():
-        result |= {E2EJob(K8S.latest, postgres_version)}
-
-    return result
+    # For the moment main tests are identical to pull request
+    return build_pull_request_include_local()
 
 
+@lru_cache(maxsize=1)
 def build_schedule_include_local():
     """Build the list of tests running on schedule"""
     # For the moment scheduled tests are identical to main
@@ -164,25 +184,32 @@ def build_pull_request_include_cloud(engine_version_list):
 
 
 def build_main_include_cloud(engine_version_list):
-    return {
-        E2EJob(engine_version_list.latest, POSTGRES.latest),
-    }
+    return add_jobs({}, [(engine_version_list.latest, POSTGRES.latest)])
 
 
 def build_schedule_include_cloud(engine_version_list):
     """Build the list of tests running on schedule"""
-    result = set()
-    # Iterate over K8S versions
-    for k8s_version in engine_version_list:
-        result |= {
-            E2EJob(k8s_version, POSTGRES.latest),
-        }
+    # Iterate over K8S versions, then over PostgreSQL versions
+    pairs = [(k8s_version, POSTGRES.latest) for k8s_version in engine_version_list]
+    pairs += [
+        (engine_version_list.latest, postgres_version)
+        for postgres_version in POSTGRES.values()
+    ]
+
+    return add_jobs({}, pairs)
 
-    # Iterate over PostgreSQL versions
-    for postgres_version in POSTGRES.values():
-        result |= {E2EJob(engine_version_list.latest, postgres_version)}
 
-    return result
+def write_outputs(outputs):
+    """Write the (name, value) step outputs to the $GITHUB_OUTPUT file,
+    falling back to the set-output command on stdout outside of GitHub Actions
+    """
+    github_output = os.environ.get("GITHUB_OUTPUT")
+    if github_output:
+        with open(github_output, "a") as output_file:
+            output_file.write("".join(f"{name}={value}\n" for name, value in outputs))
+    else:
+        for name, value in outputs:
+            print(f"::set-output name={name}::{value}")
 
 
 ENGINE_MODES = {
@@ -225,15 +252,20 @@ if __name__ == "__main__":
             )
         engines = required_engines
 
-    matrix = {}
+    outputs = []
     for engine in ENGINE_MODES:
         include = {}
         if engine in engines:
-            include = list(
-                sorted(ENGINE_MODES[engine][args.mode](), key=itemgetter("id"))
-            )
-        for job in include:
-            job["id"] = engine + "-" + job["id"]
-            print(f"Generating {engine}: {job['id']}", file=sys.stderr)
-        print(f"::set-output name={engine}Matrix::" + json.dumps({"include": include}))
-        print(f"::set-output name={engine}Enabled::" + str(len(include) > 0))
+            # jobs are emitted in the order the builders added them
+            include = [
+                dict(job.to_dict(), id=engine + "-" + job.id)
+                for job in ENGINE_MODES[engine][args.mode]().values()
+            ]
+        sys.stderr.write(
+            "".join(f"Generating {engine}: {job['id']}\n" for job in include)
+        )
+        matrix_json = json.dumps({"include": include}, separators=(",", ":"))
+        outputs.append((f"{engine}Matrix", matrix_json))
+        outputs.append((f"{engine}Enabled", str(len(include) > 0)))
+
+    write_outputs(outputs)
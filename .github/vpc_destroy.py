@@ -9,20 +9,20 @@
 import argparse
 import logging
 import os
-import time
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 import boto3
-from botocore.exceptions import ClientError
+from botocore.exceptions import ClientError, WaiterError
+from botocore.waiter import WaiterModel, create_waiter_with_client
 
 logger = logging.getLogger("root")
 FORMAT = "[%(filename)s:%(lineno)s - %(funcName)20s() ] %(message)s"
 logging.basicConfig(format=FORMAT, level=logging.INFO)
 
 
-def destroy_ec2(vpc_id, aws_region):
+def destroy_ec2(ec2, vpc_id, aws_region):
     logger.debug(f"{vpc_id}")
-    ec2 = boto3.resource("ec2", region_name=aws_region)
     ec2client = ec2.meta.client
     # test for valid credentials
     try:
@@ -70,12 +70,12 @@ def destroy_ec2(vpc_id, aws_region):
         waiter.wait(InstanceIds=instance_ids)
 
 
-def destroy_services(vpc_id, aws_region, services):
+def destroy_services(ec2, vpc_id, aws_region, services):
     services_map = {"ec2": destroy_ec2}
 
     for service in services.split(","):
         try:
-            services_map[service](vpc_id, aws_region)
+            services_map[service](ec2, vpc_id, aws_region)
         except KeyError:
             logger.error(f"destroying {service} not implemented")
 
@@ -89,8 +89,58 @@ def vpc_exists(ec2client, vpc_id):
     return True
 
 
-def delete_vpc(vpc_id, aws_region, release_eips=False):
-    ec2 = boto3.resource("ec2", region_name=aws_region)
+def describe_all(ec2client, operation, result_key, **kwargs):
+    """Collect the items of a describe_* call across all the result pages"""
+    paginator = ec2client.get_paginator(operation)
+    return [item for page in paginator.paginate(**kwargs) for item in page[result_key]]
+
+
+def network_interfaces_deleted_waiter(ec2client):
+    """Waiter succeeding once describe_network_interfaces returns no ENIs"""
+    waiter_model = WaiterModel(
+        {
+            "version": 2,
+            "waiters": {
+                "NetworkInterfacesDeleted": {
+                    "operation": "DescribeNetworkInterfaces",
+                    "delay": 5,
+                    "maxAttempts": 60,
+                    "acceptors": [
+                        {
+                            "matcher": "path",
+                            "argument": "length(NetworkInterfaces[]) == `0`",
+                            "expected": True,
+                            "state": "success",
+                        },
+                    ],
+                },
+            },
+        }
+    )
+    return create_waiter_with_client(
+        "NetworkInterfacesDeleted", waiter_model, ec2client
+    )
+
+
+def delete_network_interface(ec2client, ni):
+    eni_id = ni["NetworkInterfaceId"]
+    logger.info(f"deleting ENI {eni_id}")
+    try:
+        if "Attachment" in ni:
+            ec2client.detach_network_interface(
+                AttachmentId=ni["Attachment"]["AttachmentId"], Force=True
+            )
+            ec2client.get_waiter("network_interface_available").wait(
+                NetworkInterfaceIds=[eni_id], WaiterConfig={"Delay": 5}
+            )
+        ec2client.delete_network_interface(NetworkInterfaceId=eni_id)
+    except (ClientError, WaiterError) as e:
+        # ENIs managed by AWS (e.g. the ones of a NAT gateway) can't be
+        # detached by us, but will be released together with their owner
+        logging.info(e)
+
+
+def delete_vpc(ec2, vpc_id, aws_region, release_eips=False):
     ec2client = ec2.meta.client
     if not vpc_exists(ec2client, vpc_id):
         print(f"VPC {vpc_id} does not exist in {aws_region}")
@@ -110,11 +160,41 @@ def delete_vpc(vpc_id, aws_region, release_eips=False):
 
     vpc = ec2.Vpc(vpc_id)
 
+    # the describe calls below don't depend on each other, so we issue them
+    # concurrently up front instead of one round-trip at a time
+    filters = [{"Name": "vpc-id", "Values": [vpc_id]}]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        tgw_attachments = executor.submit(
+            describe_all,
+            ec2client,
+            "describe_transit_gateway_attachments",
+            "TransitGatewayAttachments",
+            Filters=[{"Name": "resource-id", "Values": [vpc_id]}],
+        )
+        nat_gateways = executor.submit(
+            describe_all,
+            ec2client,
+            "describe_nat_gateways",
+            "NatGateways",
+            Filters=filters,
+        )
+        vpc_peers = executor.submit(
+            describe_all,
+            ec2client,
+            "describe_vpc_peering_connections",
+            "VpcPeeringConnections",
+        )
+        vpc_endpoints = executor.submit(
+            describe_all,
+            ec2client,
+            "describe_vpc_endpoints",
+            "VpcEndpoints",
+            Filters=filters,
+        )
+
     # delete transit gateway attachment for this vpc
     # note - this only handles vpc attachments, not vpn
-    for attachment in ec2client.describe_transit_gateway_attachments()[
-        "TransitGatewayAttachments"
-    ]:
+    for attachment in tgw_attachments.result():
         if attachment["ResourceId"] == vpc_id:
             ec2client.delete_transit_gateway_vpc_attachment(
                 TransitGatewayAttachmentId=attachment["TransitGatewayAttachmentId"]
@@ -123,9 +203,15 @@ def delete_vpc(vpc_id, aws_region, release_eips=False):
     # delete NAT Gateways
     # attached ENIs are automatically deleted
     # EIPs are disassociated but not released
-    filters = [{"Name": "vpc-id", "Values": [vpc_id]}]
-    for nat_gateway in ec2client.describe_nat_gateways(Filters=filters)["NatGateways"]:
-        ec2client.delete_nat_gateway(NatGatewayId=nat_gateway["NatGatewayId"])
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(
+            executor.map(
+                lambda nat_gateway: ec2client.delete_nat_gateway(
+                    NatGatewayId=nat_gateway["NatGatewayId"]
+                ),
+                nat_gateways.result(),
+            )
+        )
 
     # detach default dhcp_options if associated with the vpc
     dhcp_options_default = ec2.DhcpOptions("default")
@@ -133,18 +219,14 @@ def delete_vpc(vpc_id, aws_region, release_eips=False):
         dhcp_options_default.associate_with_vpc(VpcId=vpc.id)
 
     # delete any vpc peering connections
-    for vpc_peer in ec2client.describe_vpc_peering_connections()[
-        "VpcPeeringConnections"
-    ]:
+    for vpc_peer in vpc_peers.result():
         if vpc_peer["AccepterVpcInfo"]["VpcId"] == vpc_id:
             ec2.VpcPeeringConnection(vpc_peer["VpcPeeringConnectionId"]).delete()
         if vpc_peer["RequesterVpcInfo"]["VpcId"] == vpc_id:
             ec2.VpcPeeringConnection(vpc_peer["VpcPeeringConnectionId"]).delete()
 
     # delete our endpoints
-    for ep in ec2client.describe_vpc_endpoints(
-        Filters=[{"Name": "vpc-id", "Values": [vpc_id]}]
-    )["VpcEndpoints"]:
+    for ep in vpc_endpoints.result():
         ec2client.delete_vpc_endpoints(VpcEndpointIds=[ep["VpcEndpointId"]])
 
     # delete custom NACLs
@@ -153,32 +235,26 @@ def delete_vpc(vpc_id, aws_region, release_eips=False):
             netacl.delete()
 
     # ensure ENIs are deleted before proceding
-    timeout = time.time() + 300
     filter = [{"Name": "vpc-id", "Values": [vpc_id]}]
     logger.info(f"proceed with deleting ENIs")
-    reached_timeout = True
-    while time.time() < timeout:
-        if not ec2client.describe_network_interfaces(Filters=filters)[
-            "NetworkInterfaces"
-        ]:
-            logger.info(f"no ENIs remaining")
-            reached_timeout = False
-            break
-        else:
-            logger.info(f"waiting on ENIs to delete")
-            client = boto3.client('ec2')
-            ec2resouce = boto3.resource('ec2')
-            for ni in ec2client.describe_network_interfaces(Filters=filters)["NetworkInterfaces"]:
-                print(ni["NetworkInterfaceId"])
-                network_interface = ec2resouce.NetworkInterface(ni["NetworkInterfaceId"])
-                if "AttachmentId" in ni:
-                    network_interface.detach(Force=True)
-                time.sleep(10)
-                network_interface.delete()
-            time.sleep(30)
-
-    if reached_timeout:
+    network_interfaces = describe_all(
+        ec2client, "describe_network_interfaces", "NetworkInterfaces", Filters=filter
+    )
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(
+            executor.map(
+                lambda ni: delete_network_interface(ec2client, ni), network_interfaces
+            )
+        )
+
+    logger.info(f"waiting on ENIs to delete")
+    try:
+        network_interfaces_deleted_waiter(ec2client).wait(Filters=filter)
+        logger.info(f"no ENIs remaining")
+    except WaiterError as e:
+        logging.info(e)
         logger.info(f"ENI deletion timed out")
+
     # delete subnets
     for subnet in vpc.subnets.all():
         for interface in subnet.network_interfaces.all():
@@ -208,17 +284,6 @@ def delete_vpc(vpc_id, aws_region, release_eips=False):
         if route_table["Associations"] == []:
             ec2client.delete_route_table(RouteTableId=route_table["RouteTableId"])
 
-    # destroy NAT gateways
-    filters = [{"Name": "vpc-id", "Values": [vpc_id]}]
-    nat_gateway_ids = [
-        nat_gateway["NatGatewayId"]
-        for nat_gateway in ec2client.describe_nat_gateways(Filters=filters)[
-            "NatGateways"
-        ]
-    ]
-    for nat_gateway_id in nat_gateway_ids:
-        ec2client.delete_nat_gateway(NatGatewayId=nat_gateway_id)
-
     # detach and delete all IGWs associated with the vpc
     for gw in vpc.internet_gateways.all():
         vpc.detach_internet_gateway(InternetGatewayId=gw.id)
@@ -254,12 +319,17 @@ if __name__ == "__main__":
         aws_region = os.environ["AWS_DEFAULT_REGION"]
     vpc_id = args.vpc_id
     print(f"type: {type(vpc_id)}")
+
+    # a single session and resource is shared by all the steps, so the EC2
+    # service model is only loaded once
+    session = boto3.session.Session(region_name=aws_region)
+    ec2 = session.resource("ec2")
     if args.services:
         logger.info(f"calling destroy_services with {args.services}")
-        destroy_services(args.vpc_id, aws_region, args.services)
+        destroy_services(ec2, args.vpc_id, aws_region, args.services)
 
     logger.info(f"calling delete_vpc with {vpc_id}")
-    if delete_vpc(vpc_id=vpc_id, aws_region=aws_region, release_eips=False):
+    if delete_vpc(ec2=ec2, vpc_id=vpc_id, aws_region=aws_region, release_eips=False):
         print(f"destroyed {vpc_id} in {aws_region}")
     else:
         print(f"unable to destroy {vpc_id} in {aws_region}")
\ No newline at end of file